@@ -0,0 +1,34 @@
+from typing import Any
+
+import msgpack
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+class NumpyJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, serializing numpy arrays natively.
+
+    Trace payloads carry large sample arrays; orjson writes them straight from
+    the array buffer instead of going through one Python float per sample.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _pack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder("<")).tobytes()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+class MsgpackResponse(Response):
+    """msgpack response; numpy arrays are written as raw little-endian bytes."""
+
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_pack_default)
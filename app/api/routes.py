@@ -1,26 +1,38 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+import asyncio
+import os
 from typing import List, Dict, Any
-from datetime import datetime
+import base64
+import struct
+
+import orjson
 
-from flask import jsonify
-import obspy
 from app.core.data_loader import (
     get_dataset_files, get_datasets, get_time_range, load_data,
     generate_metadata, check_data_integrity, get_available_date_ranges,
-    print_file_dates
+    print_file_dates, get_parquet_path, sync_if_changed
 )
-from app.core.processing import get_denoising_methods, get_method_parameters, get_raw_data_from_files, process_data, detect_events
+from app.core.processing import get_denoising_methods, get_method_parameters, get_raw_data_from_files, get_raw_array_from_files, process_data, detect_events
 from app.models.schemas import (
-    DatasetFiles, DatasetInfo, FileInfo, ProcessingRequest, PerformanceMetrics,
-    EventDetectionRequest, DetectedEvent, TimeSeriesData, ComparisonData,
-    AvailableDates
+    DatasetFiles, DatasetFilesV1, DatasetInfo, ProcessingRequest, PerformanceMetrics,
+    EventDetectionRequest, DetectedEvent, AvailableDates
 )
+from app.api.responses import MsgpackResponse, NumpyJSONResponse
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# The methods and their parameters are static, so the response is built once
+PROCESSING_METHODS = {method: get_method_parameters(method) for method in get_denoising_methods()}
+
+async def _run_sync(func, *args):
+    # These calls may resync metadata (parsing files, writing Parquet, waiting on
+    # the ingest lock held by another worker), so keep them off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
 @router.get("/datasets", response_model=List[DatasetInfo])
 async def datasets():
     """Get available datasets."""
@@ -30,24 +42,11 @@ async def datasets():
 async def timerange(dataset: str):
     """Get time range for a specific dataset."""
     try:
-        start, end = get_time_range(dataset)
+        start, end = await _run_sync(get_time_range, dataset)
         return {"start_time": start.isoformat(), "end_time": end.isoformat()}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.get("/{dataset}/{file}")
-async def get_mseed_data(dataset: str, file: str):
-    try:
-        data = await get_raw_data_from_files(dataset, file)
-        return data
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="File not found")
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="An unexpected error occurred")
-
-
 # @router.get("/datasets/{dataset}/available-dates", response_model=AvailableDates)
 # async def available_dates(dataset: str):
 #     """Get available dates for a specific dataset."""
@@ -60,8 +59,7 @@ async def get_mseed_data(dataset: str, file: str):
 @router.get("/processing-methods", response_model=Dict[str, Dict[str, Any]])
 async def processing_methods():
     """Get available processing methods and their parameters."""
-    methods = get_denoising_methods()
-    return {method: get_method_parameters(method) for method in methods}
+    return PROCESSING_METHODS
 
 # @router.post("/process", response_model=PerformanceMetrics)
 # async def process(request: ProcessingRequest):
@@ -98,12 +96,29 @@ async def processing_methods():
 #         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/{dataset}/files", response_model=DatasetFiles)
+# The file listings return the response directly: with a response_model FastAPI
+# would validate the trusted DB rows again on the way out. The models still
+# document the schema through `responses`.
+@router.get("/{dataset}/files", response_model=None, responses={200: {"model": DatasetFiles}})
 async def dataset_files(dataset: str):
-    """Get files and their time ranges for a specific dataset."""
+    """Get files and their time ranges for a specific dataset, as parallel lists."""
+    try:
+        files = await _run_sync(get_dataset_files, dataset)
+        return NumpyJSONResponse({
+            "filenames": [file['filename'] for file in files],
+            "start_times": [file['start_time'] for file in files],
+            "end_times": [file['end_time'] for file in files]
+        })
+    except Exception as e:
+        logger.error(f"Error getting files for {dataset}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error getting files: {str(e)}")
+
+@router.get("/v1/{dataset}/files", response_model=None, responses={200: {"model": DatasetFilesV1}})
+async def dataset_files_v1(dataset: str):
+    """Get files and their time ranges for a specific dataset, one object per file."""
     try:
-        files = get_dataset_files(dataset)
-        return DatasetFiles(files=[FileInfo(**file) for file in files])
+        # Rows already have exactly FileInfo's fields
+        return NumpyJSONResponse({"files": await _run_sync(get_dataset_files, dataset)})
     except Exception as e:
         logger.error(f"Error getting files for {dataset}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting files: {str(e)}")
@@ -129,7 +144,52 @@ async def dataset_files(dataset: str):
 async def print_file_dates_endpoint(dataset: str):
     """Print start and end dates for each file in a dataset."""
     try:
-        print_file_dates(dataset)
+        await _run_sync(print_file_dates, dataset)
         return {"message": f"File dates printed for {dataset}"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _iter_binary_traces(amp, chunk_size=1 << 20):
+    yield struct.pack("<II", *amp.shape)
+    buf = memoryview(amp.astype("<f4", copy=False)).cast("B")
+    for offset in range(0, len(buf), chunk_size):
+        yield bytes(buf[offset:offset + chunk_size])
+
+@router.get("/{dataset}/{file}.parquet")
+async def get_parquet_data(dataset: str, file: str):
+    """Get the zstd Parquet copy of a file (columns: channel, time, amplitude) written at ingest."""
+    await _run_sync(sync_if_changed, dataset)
+    path = get_parquet_path(dataset, file)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Parquet file not found")
+    return FileResponse(path, media_type="application/vnd.apache.parquet")
+
+# Catch-all file route; keep it last so it does not shadow the two-segment routes above.
+@router.get("/{dataset}/{file}", deprecated=True)
+async def get_mseed_data(dataset: str, file: str, format: str = Query("json", pattern="^(json|msgpack|bin)$")):
+    """Get trace data for a file. Deprecated in favour of ``/{dataset}/{file}.parquet``.
+
+    ``format=msgpack`` sends amplitudes as raw little-endian bytes. ``format=bin``
+    sends an 8-byte ``<II`` (channels, samples) header followed by a little-endian
+    float32 ``[channels, samples]`` array; the JSON metadata is base64-encoded in
+    the ``X-Trace-Meta`` header.
+    """
+    try:
+        if format == "bin":
+            meta, amp = await get_raw_array_from_files(dataset, file)
+            return StreamingResponse(
+                _iter_binary_traces(amp),
+                media_type="application/octet-stream",
+                headers={"X-Trace-Meta": base64.b64encode(orjson.dumps(meta)).decode("ascii")}
+            )
+        data = await get_raw_data_from_files(dataset, file)
+        if format == "msgpack":
+            return MsgpackResponse(data)
+        # Return the response directly; jsonable_encoder would choke on the numpy arrays
+        return NumpyJSONResponse(data)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="An unexpected error occurred")
@@ -1,34 +1,102 @@
 import os
 from obspy import Stream, read
-from datetime import datetime
 import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from app.core.database import insert_file_metadata, get_dataset_timerange, get_files_in_timerange, init_db
+from app.core.database import (
+    replace_file_metadata, delete_file_metadata, get_file_mtimes, get_dataset_timerange,
+    get_dataset_file_ranges, get_dataset_traces, init_db, INSTANCE_DIR
+)
+from app.core.kernels import has_nonfinite
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 DATA_DIR = "data"
+# mseed reads spend most of their time in syscalls and obspy's C decoder, which
+# release the GIL, so the pool is sized for I/O rather than for CPU count.
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Number of parsed files kept in memory by read_cached
+STREAM_CACHE_SIZE = int(os.getenv('STREAM_CACHE_SIZE', 64))
+# Per-dataset subdirectory holding the Parquet copies written at ingest
+PARQUET_DIR = "parquet"
+# Serializes metadata syncs across uvicorn workers sharing the instance folder
+INGEST_LOCK_FILE = os.path.join(INSTANCE_DIR, 'ingest.lock')
+# Per-file mtimes each dataset was last synced at, see sync_if_changed
+_synced_mtimes = {}
+_sync_lock = threading.Lock()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def read_sequential(file_path, **kwargs):
+    """obspy.read() a whole file, hinting the kernel to read ahead sequentially.
+
+    Helps cold-cache reads of large files; posix_fadvise is skipped on
+    platforms that do not provide it.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        f = os.fdopen(fd, 'rb')
+    except Exception:
+        os.close(fd)
+        raise
+    with f:
+        return read(f, **kwargs)
+
+@lru_cache(maxsize=STREAM_CACHE_SIZE)
+def _read_cached(file_path, mtime_ns):
+    return read_sequential(file_path)
+
+def read_cached(file_path):
+    """Read a whole mseed file, reusing the parsed Stream while the file's mtime is unchanged.
+
+    The returned Stream is shared between callers and must not be modified in place.
+    """
+    return _read_cached(file_path, os.stat(file_path).st_mtime_ns)
+
+@lru_cache(maxsize=64)
+def _scan_mseed(path, mtime_ns):
+    with os.scandir(path) as entries:
+        return tuple(sorted(e.name for e in entries if e.is_file() and e.name.endswith('.mseed')))
+
+def _list_mseed(path):
+    """List .mseed files in a directory, cached until the directory's mtime changes."""
+    return _scan_mseed(path, os.stat(path).st_mtime_ns)
+
+def _mseed_mtimes(path):
+    """Map each .mseed file in a directory to its mtime, in one scandir pass."""
+    with os.scandir(path) as entries:
+        return {e.name: e.stat().st_mtime_ns for e in entries if e.is_file() and e.name.endswith('.mseed')}
+
+@lru_cache(maxsize=1)
+def _scan_datasets(path, mtime_ns):
+    with os.scandir(path) as entries:
+        return tuple(sorted(e.name for e in entries if e.is_dir()))
+
 def get_datasets():
-    """Return available datasets (lunar and mars)."""
-    datasets = [d for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d))]
+    """Return available datasets (lunar and mars), cached until DATA_DIR's mtime changes."""
+    datasets = _scan_datasets(DATA_DIR, os.stat(DATA_DIR).st_mtime_ns)
     if not datasets:
         logger.warning("No datasets found in the data directory.")
     return datasets
 
 def get_time_range(dataset):
-    """Get time range for a dataset."""
-    data_path = os.path.join(DATA_DIR, dataset)
-    start_time = None
-    end_time = None
-    for file in os.listdir(data_path):
-        if file.endswith('.mseed'):
-            st = read(os.path.join(data_path, file))
-            if start_time is None or st[0].stats.starttime < start_time:
-                start_time = st[0].stats.starttime
-            if end_time is None or st[0].stats.endtime > end_time:
-                end_time = st[0].stats.endtime
+    """Get time range for a dataset from the metadata database."""
+    sync_if_changed(dataset)
+    start_time, end_time = get_dataset_timerange(dataset)
+    if start_time is None or end_time is None:
+        raise ValueError(f"No metadata found for dataset {dataset}")
     return start_time, end_time
 
 def load_data(dataset, start_time, end_time):
@@ -36,15 +104,14 @@ def load_data(dataset, start_time, end_time):
     data_path = os.path.join(DATA_DIR, dataset, "data")
     st = Stream()
     
-    for file in os.listdir(data_path):
-        if file.endswith('.mseed'):
-            try:
-                file_st = read(os.path.join(data_path, file))
-                for tr in file_st:
-                    if tr.stats.starttime <= end_time and tr.stats.endtime >= start_time:
-                        st += tr
-            except Exception as e:
-                logger.error(f"Error reading file {file}: {str(e)}")
+    for file in _list_mseed(data_path):
+        try:
+            file_st = read_cached(os.path.join(data_path, file))
+            for tr in file_st:
+                if tr.stats.starttime <= end_time and tr.stats.endtime >= start_time:
+                    st += tr
+        except Exception as e:
+            logger.error(f"Error reading file {file}: {str(e)}")
     
     if len(st) == 0:
         logger.warning(f"No data found for the specified time range in dataset {dataset}")
@@ -52,10 +119,17 @@ def load_data(dataset, start_time, end_time):
     
     return st
 
-def process_file(file_path, dataset):
-    """Process a single file and return its metadata."""
+def process_file(file_path, dataset, st=None, file_mtime=None):
+    """Process a single file and return its metadata.
+
+    Reads headers only, unless an already parsed Stream (and the mtime taken
+    before parsing it) is passed in.
+    """
     try:
-        st = read(file_path)
+        if file_mtime is None:
+            file_mtime = os.stat(file_path).st_mtime_ns
+        if st is None:
+            st = read(file_path, headonly=True)
         metadata = []
         for tr in st:
             metadata.append({
@@ -63,15 +137,96 @@ def process_file(file_path, dataset):
                 'filename': os.path.basename(file_path),
                 'start_time': tr.stats.starttime.datetime,
                 'end_time': tr.stats.endtime.datetime,
-                'sampling_rate': tr.stats.sampling_rate
+                'sampling_rate': tr.stats.sampling_rate,
+                'file_mtime': file_mtime
             })
         return metadata
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {str(e)}")
         return []
 
+def get_parquet_path(dataset, file):
+    """Path of the Parquet copy of a dataset file (with or without its .mseed extension)."""
+    # Only a literal .mseed suffix is stripped: SEED-style names contain other dots
+    stem = file[:-len('.mseed')] if file.endswith('.mseed') else file
+    return os.path.join(DATA_DIR, dataset, PARQUET_DIR, stem + '.parquet')
+
+def export_parquet(file_path, dataset, st=None):
+    """Write a zstd-compressed Parquet copy of an mseed file with channel, time, amplitude columns.
+
+    Times are POSIX timestamps in seconds. Pass ``st`` to reuse an already parsed Stream.
+    """
+    if st is None:
+        st = read_sequential(file_path)
+    target = get_parquet_path(dataset, os.path.basename(file_path))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    table = pa.table({
+        'channel': pa.DictionaryArray.from_arrays(
+            np.repeat(np.arange(len(st), dtype=np.int32), [tr.stats.npts for tr in st]),
+            [tr.stats.channel for tr in st]
+        ),
+        'time': np.concatenate([tr.times('timestamp') for tr in st]) if len(st) else np.empty(0),
+        'amplitude': np.concatenate([tr.data.astype(np.float64, copy=False) for tr in st]) if len(st) else np.empty(0)
+    })
+    # Write to a uniquely named file next to the target and rename, so readers and
+    # concurrent writers never see or clobber a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.parquet.tmp')
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, target)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+def ingest_file(file_path, dataset):
+    """Parse a file once, write its Parquet copy and return its metadata rows."""
+    file_mtime = os.stat(file_path).st_mtime_ns
+    st = read_sequential(file_path)
+    try:
+        export_parquet(file_path, dataset, st)
+    except Exception as e:
+        logger.error(f"Error writing Parquet for {os.path.basename(file_path)}: {str(e)}")
+    return process_file(file_path, dataset, st, file_mtime)
+
+@contextmanager
+def _ingest_lock():
+    with open(INGEST_LOCK_FILE, 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
 def generate_metadata(dataset):
-    """Generate metadata for a dataset and store in the database."""
+    """Sync the metadata database with the .mseed files of a dataset.
+
+    Only files that are new or whose mtime changed since the last sync are
+    re-read; rows for files that disappeared from disk are dropped. Each
+    re-read file is parsed once for both its rows and a fresh Parquet copy
+    (see ingest_file).
+    Concurrent syncs from other worker processes wait on a file lock, then
+    find the dataset already up to date.
+    """
+    with _ingest_lock():
+        _generate_metadata(dataset)
+
+def sync_all_metadata():
+    """Sync every dataset once; run before starting the server workers."""
+    try:
+        datasets = get_datasets()
+    except FileNotFoundError:
+        logger.warning("Data directory not found; skipping metadata sync")
+        return
+    for dataset in datasets:
+        try:
+            sync_if_changed(dataset)
+        except Exception as e:
+            logger.error(f"Error syncing metadata for {dataset}: {str(e)}")
+
+def _generate_metadata(dataset):
     init_db()  # Ensure the database is initialized
     data_path = os.path.join(DATA_DIR, dataset)
     
@@ -79,95 +234,115 @@ def generate_metadata(dataset):
         logger.error(f"Data path does not exist: {data_path}")
         raise FileNotFoundError(f"Data path does not exist: {data_path}")
     
-    files = [f for f in os.listdir(data_path) if f.endswith('.mseed')]
+    files = _mseed_mtimes(data_path)
     
     if not files:
         logger.warning(f"No .mseed files found in {data_path}")
+    
+    known = get_file_mtimes(dataset)
+    removed = [f for f in known if f not in files]
+    changed = [f for f, mtime in files.items() if known.get(f) != mtime]
+    
+    if removed:
+        delete_file_metadata(dataset, removed)
+        for f in removed:
+            if os.path.exists(get_parquet_path(dataset, f)):
+                os.remove(get_parquet_path(dataset, f))
+    changed_set = set(changed)
+    exports = [f for f in files if f in changed_set or not os.path.exists(get_parquet_path(dataset, f))]
+    if not changed and not exports:
+        if removed:
+            logger.info(f"Metadata for {dataset} updated ({len(removed)} removed)")
+        else:
+            logger.info(f"Metadata for {dataset} is up to date")
         return
     
-    with ThreadPoolExecutor() as executor:
-        future_to_file = {executor.submit(process_file, os.path.join(data_path, f), dataset): f for f in files}
+    # Every changed file is also an export, so each file is parsed exactly once
+    rows = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_file = {executor.submit(ingest_file, os.path.join(data_path, f), dataset): f for f in exports}
         for future in as_completed(future_to_file):
             file = future_to_file[future]
             try:
-                metadata = future.result()
-                for item in metadata:
-                    insert_file_metadata(**item)
+                file_rows = future.result()
             except Exception as e:
                 logger.error(f"Error processing file {file}: {str(e)}")
+                continue
+            if file in changed_set:
+                rows.extend(file_rows)
+    
+    if changed:
+        # Flush once so the whole sync costs a single transaction
+        replace_file_metadata(dataset, changed, rows)
     
-    logger.info(f"Metadata generation completed for {dataset}")
+    logger.info(f"Metadata generation completed for {dataset} ({len(changed)} files updated, "
+                f"{len(removed)} removed, {len(exports)} Parquet files written)")
 
-def get_dataset_files(dataset):
-    """Get files and their time ranges for a dataset."""
+def sync_if_changed(dataset):
+    """Run an incremental generate_metadata when any .mseed file of a dataset changed since the last sync.
+
+    Files are compared by name and mtime, so additions, removals and in-place
+    rewrites are all picked up; unchanged datasets cost one scandir. The
+    snapshot is taken before syncing, so a file touched while the sync runs
+    differs from it and is picked up by the next call.
+    """
     data_path = os.path.join(DATA_DIR, dataset)
-    files_info = []
-    
-    logger.info(f"Searching for .mseed files in {data_path}")
-    
-    for file in os.listdir(data_path):
-        if file.endswith('.mseed'):
-            logger.info(f"Processing file: {file}")
-            try:
-                st = read(os.path.join(data_path, file))
-                start_time = min(tr.stats.starttime for tr in st)
-                end_time = max(tr.stats.endtime for tr in st)
-                files_info.append({
-                    "filename": file,
-                    "start_time": start_time.datetime,
-                    "end_time": end_time.datetime
-                })
-                logger.info(f"Added file: {file}, Start: {start_time}, End: {end_time}")
-            except Exception as e:
-                logger.error(f"Error processing file {file}: {str(e)}")
-    
+    try:
+        snapshot = _mseed_mtimes(data_path)
+    except FileNotFoundError:
+        return
+    if _synced_mtimes.get(dataset) == snapshot:
+        return
+    with _sync_lock:
+        snapshot = _mseed_mtimes(data_path)
+        if _synced_mtimes.get(dataset) == snapshot:
+            return
+        generate_metadata(dataset)
+        _synced_mtimes[dataset] = snapshot
+
+def get_dataset_files(dataset):
+    """Get files and their time ranges for a dataset from the metadata database."""
+    sync_if_changed(dataset)
+    files_info = get_dataset_file_ranges(dataset)
     logger.info(f"Found {len(files_info)} files")
-    return sorted(files_info, key=lambda x: x['start_time'])
+    return files_info
 
 def get_available_date_ranges(dataset):
     """Get available dates for a dataset."""
-    data_path = os.path.join(DATA_DIR, dataset)
-    available_dates = []
+    sync_if_changed(dataset)
+    return [{"Start": row['start_time'], "End": row['end_time']} for row in get_dataset_traces(dataset)]
 
+def check_file_integrity(file_path, dataset):
+    """Check a single mseed file for empty streams and non-finite samples."""
+    file = os.path.basename(file_path)
     try:
-        for file in os.listdir(data_path):
-            if file.endswith('.mseed'):
-                st = read(os.path.join(data_path, file))
-                for tr in st:
-                    available_dates.append({
-                        "Start": tr.stats.starttime,
-                        "End": tr.stats.endtime
-                    })
+        st = read(file_path)
+        if len(st) == 0:
+            logger.warning(f"File {file} in {dataset} contains no traces")
+        for tr in st:
+            # Integer samples cannot be NaN or infinite
+            if np.issubdtype(tr.data.dtype, np.floating) and has_nonfinite(tr.data):
+                logger.warning(f"File {file} in {dataset} contains NaN or infinite values")
     except Exception as e:
-        print(f"Error processing file {file}: {e}")
-
-    return sorted(available_dates, key=lambda x: x['Start'])  # Remove duplicates and sort
+        logger.error(f"Error reading file {file} in {dataset}: {str(e)}")
 
 def check_data_integrity(dataset):
     """Check the integrity of all mseed files in a dataset."""
     data_path = os.path.join(DATA_DIR, dataset)
+    files = _list_mseed(data_path)
     
-    for file in os.listdir(data_path):
-        if file.endswith('.mseed'):
-            try:
-                st = read(os.path.join(data_path, file))
-                if len(st) == 0:
-                    logger.warning(f"File {file} in {dataset} contains no traces")
-                for tr in st:
-                    if np.isnan(tr.data).any():
-                        logger.warning(f"File {file} in {dataset} contains NaN values")
-                    if not np.isfinite(tr.data).all():
-                        logger.warning(f"File {file} in {dataset} contains infinite values")
-            except Exception as e:
-                logger.error(f"Error reading file {file} in {dataset}: {str(e)}")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(check_file_integrity, os.path.join(data_path, f), dataset) for f in files]
+        for future in as_completed(futures):
+            future.result()
     
     logger.info(f"Completed integrity check for {dataset}")
 
 def print_file_dates(dataset):
-    data_path = os.path.join(DATA_DIR, dataset)
-    for file in os.listdir(data_path):
-        if file.endswith('.mseed'):
-            st = read(os.path.join(data_path, file))
-            print(f"File: {file}")
-            for tr in st:
-                print(f"  Start: {tr.stats.starttime}, End: {tr.stats.endtime}")
\ No newline at end of file
+    sync_if_changed(dataset)
+    current_file = None
+    for row in sorted(get_dataset_traces(dataset), key=lambda x: x['filename']):
+        if row['filename'] != current_file:
+            current_file = row['filename']
+            print(f"File: {current_file}")
+        print(f"  Start: {row['start_time']}, End: {row['end_time']}")
@@ -1,4 +1,5 @@
 import sqlite3
+import threading
 from datetime import datetime
 import os
 
@@ -14,43 +15,118 @@ os.makedirs(INSTANCE_DIR, exist_ok=True)
 # Define the database file path
 DATABASE_FILE = os.path.join(INSTANCE_DIR, 'seismic_metadata.db')
 
+# One connection is shared by the whole process; the lock serializes access
+# from request handlers and the metadata thread pool.
+_conn = None
+_lock = threading.RLock()
+
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    global _conn
+    with _lock:
+        if _conn is None:
+            _conn = sqlite3.connect(DATABASE_FILE, check_same_thread=False)
+            _conn.row_factory = sqlite3.Row
+            _conn.execute('PRAGMA synchronous=NORMAL')
+        return _conn
 
 def init_db():
     conn = get_db_connection()
-    conn.execute('''CREATE TABLE IF NOT EXISTS files
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     dataset TEXT NOT NULL,
-                     filename TEXT NOT NULL,
-                     start_time TEXT NOT NULL,
-                     end_time TEXT NOT NULL,
-                     sampling_rate REAL NOT NULL)''')
-    conn.commit()
-    conn.close()
+    with _lock:
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS files
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                             dataset TEXT NOT NULL,
+                             filename TEXT NOT NULL,
+                             start_time TEXT NOT NULL,
+                             end_time TEXT NOT NULL,
+                             sampling_rate REAL NOT NULL,
+                             file_mtime INTEGER NOT NULL DEFAULT 0)''')
+            # Databases created before file_mtime existed get the column added in place;
+            # rows with mtime 0 are treated as stale and re-ingested on the next sync.
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(files)')]
+            if 'file_mtime' not in columns:
+                conn.execute('ALTER TABLE files ADD COLUMN file_mtime INTEGER NOT NULL DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_files_dataset ON files(dataset, start_time)')
+
+def _insert_rows(conn, rows):
+    conn.executemany('INSERT INTO files (dataset, filename, start_time, end_time, sampling_rate, file_mtime) VALUES (?, ?, ?, ?, ?, ?)',
+                     [(row['dataset'], row['filename'], row['start_time'].isoformat(), row['end_time'].isoformat(),
+                       row['sampling_rate'], row.get('file_mtime', 0)) for row in rows])
+
+def insert_file_metadata(dataset, filename, start_time, end_time, sampling_rate, file_mtime=0):
+    insert_file_metadata_many([{
+        'dataset': dataset,
+        'filename': filename,
+        'start_time': start_time,
+        'end_time': end_time,
+        'sampling_rate': sampling_rate,
+        'file_mtime': file_mtime
+    }])
+
+def insert_file_metadata_many(rows):
+    """Insert metadata rows (dicts shaped like insert_file_metadata's arguments) in one transaction."""
+    conn = get_db_connection()
+    with _lock, conn:
+        _insert_rows(conn, rows)
+
+def replace_file_metadata(dataset, filenames, rows):
+    """Drop the rows of the given files and insert their new rows in one transaction."""
+    conn = get_db_connection()
+    with _lock, conn:
+        conn.executemany('DELETE FROM files WHERE dataset = ? AND filename = ?',
+                         [(dataset, filename) for filename in filenames])
+        _insert_rows(conn, rows)
 
-def insert_file_metadata(dataset, filename, start_time, end_time, sampling_rate):
+def delete_file_metadata(dataset, filenames):
     conn = get_db_connection()
-    conn.execute('INSERT INTO files (dataset, filename, start_time, end_time, sampling_rate) VALUES (?, ?, ?, ?, ?)',
-                 (dataset, filename, start_time.isoformat(), end_time.isoformat(), sampling_rate))
-    conn.commit()
-    conn.close()
+    with _lock, conn:
+        conn.executemany('DELETE FROM files WHERE dataset = ? AND filename = ?',
+                         [(dataset, filename) for filename in filenames])
+
+def get_file_mtimes(dataset):
+    conn = get_db_connection()
+    with _lock:
+        result = conn.execute('SELECT filename, MIN(file_mtime) as file_mtime FROM files WHERE dataset = ? GROUP BY filename',
+                              (dataset,)).fetchall()
+    return {row['filename']: row['file_mtime'] for row in result}
 
 def get_dataset_timerange(dataset):
     conn = get_db_connection()
-    result = conn.execute('SELECT MIN(start_time) as min_time, MAX(end_time) as max_time FROM files WHERE dataset = ?', (dataset,)).fetchone()
-    conn.close()
+    with _lock:
+        result = conn.execute('SELECT MIN(start_time) as min_time, MAX(end_time) as max_time FROM files WHERE dataset = ?', (dataset,)).fetchone()
     if result['min_time'] and result['max_time']:
         return datetime.fromisoformat(result['min_time']), datetime.fromisoformat(result['max_time'])
     return None, None
 
+def get_dataset_file_ranges(dataset):
+    conn = get_db_connection()
+    with _lock:
+        result = conn.execute('''SELECT filename, MIN(start_time) as start_time, MAX(end_time) as end_time
+                                 FROM files WHERE dataset = ?
+                                 GROUP BY filename ORDER BY start_time''', (dataset,)).fetchall()
+    return [{
+        'filename': row['filename'],
+        'start_time': datetime.fromisoformat(row['start_time']),
+        'end_time': datetime.fromisoformat(row['end_time'])
+    } for row in result]
+
+def get_dataset_traces(dataset):
+    conn = get_db_connection()
+    with _lock:
+        result = conn.execute('''SELECT filename, start_time, end_time FROM files
+                                 WHERE dataset = ? ORDER BY start_time''', (dataset,)).fetchall()
+    return [{
+        'filename': row['filename'],
+        'start_time': datetime.fromisoformat(row['start_time']),
+        'end_time': datetime.fromisoformat(row['end_time'])
+    } for row in result]
+
 def get_files_in_timerange(dataset, start_time, end_time):
     conn = get_db_connection()
-    result = conn.execute('''SELECT filename FROM files 
-                             WHERE dataset = ? AND 
-                             (start_time <= ? AND end_time >= ?)''', 
-                          (dataset, end_time.isoformat(), start_time.isoformat())).fetchall()
-    conn.close()
-    return [row['filename'] for row in result]
\ No newline at end of file
+    with _lock:
+        result = conn.execute('''SELECT filename FROM files 
+                                 WHERE dataset = ? AND 
+                                 (start_time <= ? AND end_time >= ?)''', 
+                              (dataset, end_time.isoformat(), start_time.isoformat())).fetchall()
+    return [row['filename'] for row in result]
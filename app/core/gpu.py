@@ -0,0 +1,69 @@
+import os
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+from numba import cuda
+
+try:
+    import cupy as cp
+except ImportError:
+    cp = None
+
+# The kernel runs one thread per trace, so it only pays off for many traces at
+# once; a single long trace stays on obspy's C loop. The path has not yet been
+# benchmarked on real hardware, so it is opt-in via GPU_STA_LTA_ENABLED=1.
+GPU_STA_LTA_ENABLED = os.getenv('GPU_STA_LTA_ENABLED', '0') == '1'
+GPU_MIN_TRACES = int(os.getenv('GPU_STA_LTA_MIN_TRACES', 256))
+_THREADS_PER_BLOCK = 64
+
+
+@lru_cache(maxsize=1)
+def gpu_available() -> bool:
+    """Return True if the GPU path is enabled, CuPy is installed and a CUDA device is usable."""
+    return GPU_STA_LTA_ENABLED and cp is not None and cuda.is_available()
+
+
+@cuda.jit
+def _sta_lta_kernel(data, lengths, nstas, nltas, out):
+    # One thread per trace: the recursion is sequential in time, so the
+    # parallelism is across traces. Arrays are [samples, traces] so that
+    # neighbouring threads touch neighbouring addresses at every step.
+    t = cuda.grid(1)
+    if t >= data.shape[1]:
+        return
+    n = lengths[t]
+    nlta = nltas[t]
+    csta = 1.0 / nstas[t]
+    clta = 1.0 / nlta
+    sta = 0.0
+    lta = 1e-99
+    out[0, t] = 0.0
+    for i in range(1, n):
+        sq = data[i, t] * data[i, t]
+        sta = csta * sq + (1.0 - csta) * sta
+        lta = clta * sq + (1.0 - clta) * lta
+        out[i, t] = sta / lta
+    if nlta < n:
+        for i in range(nlta):
+            out[i, t] = 0.0
+
+
+def recursive_sta_lta_batch(traces: List[np.ndarray], nstas: List[int], nltas: List[int]) -> List[np.ndarray]:
+    """GPU equivalent of obspy's recursive_sta_lta for many traces in one launch.
+
+    Only call this when gpu_available() is True.
+    """
+    lengths = np.array([len(tr) for tr in traces], dtype=np.int64)
+    host = np.zeros((int(lengths.max()), len(traces)), dtype=np.float64)
+    for i, tr in enumerate(traces):
+        host[:lengths[i], i] = tr
+    
+    data = cp.asarray(host)
+    out = cp.zeros_like(data)
+    blocks = (len(traces) + _THREADS_PER_BLOCK - 1) // _THREADS_PER_BLOCK
+    _sta_lta_kernel[blocks, _THREADS_PER_BLOCK](
+        data, cp.asarray(lengths), cp.asarray(nstas, dtype=cp.int64), cp.asarray(nltas, dtype=cp.int64), out
+    )
+    cft = cp.asnumpy(out)
+    return [np.ascontiguousarray(cft[:lengths[i], i]) for i in range(len(traces))]
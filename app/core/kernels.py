@@ -0,0 +1,86 @@
+import numpy as np
+from numba import njit, prange
+
+# Explicit signatures make Numba compile (or load from its on-disk cache) when
+# this module is imported rather than on the first request. mseed decodes to
+# int16/int32/int64/float32/float64 samples; anything else must be cast first.
+_SAMPLE_TYPES = ("int16", "int32", "int64", "float32", "float64")
+
+
+@njit([f"Tuple((float64, float64, float64, int64))({t}[:])" for t in _SAMPLE_TYPES],
+      parallel=True, fastmath=True, cache=True)
+def _snr_kernel(arr):
+    """Return (sum(|x|), mean(x), sum((x - mean)**2), n) of arr in a single pass.
+
+    The squares are accumulated around the first sample rather than zero, so
+    integer counts with a large DC offset do not lose their variance to
+    cancellation in sum(x**2) - sum(x)**2 / n.
+    """
+    n = arr.size
+    if n == 0:
+        return 0.0, 0.0, 0.0, 0
+    pivot = np.float64(arr[0])
+    abs_sum = 0.0
+    shifted_sum = 0.0
+    shifted_sq_sum = 0.0
+    for i in prange(n):
+        v = np.float64(arr[i])
+        d = v - pivot
+        abs_sum += abs(v)
+        shifted_sum += d
+        shifted_sq_sum += d * d
+    m2 = shifted_sq_sum - shifted_sum * shifted_sum / n
+    return abs_sum, pivot + shifted_sum / n, max(m2, 0.0), n
+
+
+@njit([f"float64[:, :]({t}[:], int64[:, :], float64[:])" for t in _SAMPLE_TYPES],
+      parallel=True, cache=True)
+def _annotate(data, triggers, cft):
+    """Return [peak |amplitude| in data[on:off], cft[on]] for each (on, off) trigger."""
+    out = np.empty((triggers.shape[0], 2))
+    for i in prange(triggers.shape[0]):
+        on = triggers[i, 0]
+        off = triggers[i, 1]
+        peak = 0.0
+        for j in range(on, off):
+            v = abs(np.float64(data[j]))
+            if v > peak:
+                peak = v
+        out[i, 0] = peak
+        out[i, 1] = cft[on]
+    return out
+
+
+# IEEE-754 exponent field; a value is NaN or +/-inf exactly when it is all ones
+_EXPONENT_MASKS = {
+    4: (np.uint32, np.uint32(0x7F800000)),
+    8: (np.uint64, np.uint64(0x7FF0000000000000)),
+}
+# Bounds the temporary mask to a few MB and lets bad data exit early
+_NONFINITE_CHUNK = 1 << 20
+
+
+def has_nonfinite(a):
+    """Return True if a float array holds any NaN or +/-inf.
+
+    Tests the exponent bits on an integer view of the data, which numpy
+    vectorizes into a single branchless AND/compare pass per chunk.
+    """
+    if a.dtype.itemsize not in _EXPONENT_MASKS:
+        return not np.isfinite(a).all()
+    uint, mask = _EXPONENT_MASKS[a.dtype.itemsize]
+    native = a.dtype.newbyteorder("=")
+    flat = a.reshape(-1)
+    for start in range(0, flat.size, _NONFINITE_CHUNK):
+        chunk = np.ascontiguousarray(flat[start:start + _NONFINITE_CHUNK], dtype=native)
+        if ((chunk.view(uint) & mask) == mask).any():
+            return True
+    return False
+
+
+def warmup_kernels():
+    """Run every kernel once so the first request does not pay for thread-pool start-up."""
+    for dtype in _SAMPLE_TYPES:
+        data = np.zeros(16, dtype=dtype)
+        _snr_kernel(data)
+        _annotate(data, np.zeros((1, 2), dtype=np.int64), np.zeros(16))
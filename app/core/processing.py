@@ -1,59 +1,101 @@
 import os
+import asyncio
+from functools import lru_cache
 import numpy as np
-from obspy import Stream, read
-from typing import Dict, Any, List
-from app.core.data_loader import DATA_DIR
+from obspy import Stream
+from scipy.signal import butter, sosfilt
+from typing import Dict, Any, List, Tuple
+from app.core.data_loader import DATA_DIR, read_cached
+from app.core.kernels import _snr_kernel, _annotate
 from app.models.schemas import DetectedEvent
-from datetime import datetime
 
+@lru_cache(maxsize=1)
 def get_denoising_methods():
     """Return available de-noising methods."""
-    return ["bandpass", "lowpass", "highpass", "moving_average"]
+    return ("bandpass", "lowpass", "highpass", "moving_average")
 
-async def get_raw_data_from_files(dataset: str, file: str) -> Dict[str, Any]:
-    """
-    Fetch raw data from a specified file within a dataset.
-    
-    :param dataset: Name of the dataset
-    :param file: Name of the file
-    :return: Dictionary containing metadata and trace data
-    """
+async def _read_file_stream(dataset: str, file: str) -> Stream:
     file_path = os.path.join(DATA_DIR, dataset, file)
     
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found on disk: {file_path}")
     
     try:
-        st = read(file_path)
+        st = await asyncio.get_running_loop().run_in_executor(None, read_cached, file_path)
     except Exception as e:
         raise ValueError(f"Error reading file: {str(e)}")
     
     if len(st) == 0:
         raise ValueError("No data found in the file")
+    return st
+
+def _file_metadata(dataset: str, file: str, st: Stream) -> Dict[str, Any]:
+    return {
+        "dataset": dataset,
+        "filename": file,
+        "start_time": str(st[0].stats.starttime),
+        "end_time": str(st[0].stats.endtime),
+        "sampling_rate": st[0].stats.sampling_rate
+    }
+
+def _trace_metadata(tr) -> Dict[str, Any]:
+    return {
+        "channel": tr.stats.channel,
+        "starttime": str(tr.stats.starttime),
+        "sampling_rate": tr.stats.sampling_rate,
+        "delta": tr.stats.delta,
+        "npts": tr.stats.npts
+    }
+
+async def get_raw_data_from_files(dataset: str, file: str) -> Dict[str, Any]:
+    """
+    Fetch raw data from a specified file within a dataset.
+    
+    :param dataset: Name of the dataset
+    :param file: Name of the file
+    :return: Dictionary containing metadata and trace data. Sample times are
+        not materialized; trace ``i`` is at ``starttime + i * delta``.
+    """
+    st = await _read_file_stream(dataset, file)
     
     data = {
-        "metadata": {
-            "dataset": dataset,
-            "filename": file,
-            "start_time": str(st[0].stats.starttime),
-            "end_time": str(st[0].stats.endtime),
-            "sampling_rate": st[0].stats.sampling_rate
-        },
+        "metadata": _file_metadata(dataset, file, st),
         "traces": []
     }
     
     for tr in st:
-        trace_data = {
-            "channel": tr.stats.channel,
-            "time": tr.times().tolist(),
-            "amplitude": tr.data.tolist()
-        }
+        trace_data = _trace_metadata(tr)
+        trace_data["dtype"] = tr.data.dtype.name
+        trace_data["amplitude"] = np.ascontiguousarray(tr.data, dtype=tr.data.dtype.newbyteorder("="))
         data["traces"].append(trace_data)
     
     return data
 
+async def get_raw_array_from_files(dataset: str, file: str) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    Fetch raw data from a file as one contiguous float32 array.
+    
+    :param dataset: Name of the dataset
+    :param file: Name of the file
+    :return: Metadata dictionary (without amplitudes) and a ``[channels, samples]``
+        float32 array. Traces shorter than the longest one are padded with NaN;
+        each trace's ``npts`` gives its real length.
+    """
+    st = await _read_file_stream(dataset, file)
+    
+    amp = np.full((len(st), max(tr.stats.npts for tr in st)), np.nan, dtype=np.float32)
+    for i, tr in enumerate(st):
+        amp[i, :tr.stats.npts] = tr.data
+    
+    meta = {
+        "metadata": _file_metadata(dataset, file, st),
+        "traces": [_trace_metadata(tr) for tr in st]
+    }
+    return meta, amp
+
+@lru_cache(maxsize=None)
 def get_method_parameters(method: str) -> Dict[str, Any]:
-    """Return parameters for a given de-noising method."""
+    """Return parameters for a given de-noising method. The result is shared; do not mutate it."""
     params = {
         "bandpass": {
             "freqmin": {"type": "float", "min": 0.1, "max": 25, "default": 1},
@@ -78,20 +120,15 @@ async def process_data(data: Stream, method: str, parameters: Dict[str, Any]) ->
 
     snr_before = calculate_snr(data)
     
-    if method == "bandpass":
-        processed_data = data.copy().filter('bandpass', freqmin=parameters['freqmin'], freqmax=parameters['freqmax'])
-    elif method == "lowpass":
-        processed_data = data.copy().filter('lowpass', freq=parameters['freq'])
-    elif method == "highpass":
-        processed_data = data.copy().filter('highpass', freq=parameters['freq'])
+    if method in ("bandpass", "lowpass", "highpass"):
+        processed = [sosfilt(_filter_sos(method, parameters, tr.stats.sampling_rate), tr.data.astype(np.float32))
+                     for tr in data]
     elif method == "moving_average":
-        processed_data = Stream([tr.copy() for tr in data])
-        for tr in processed_data:
-            tr.data = np.convolve(tr.data, np.ones(parameters['window_size']), 'same') / parameters['window_size']
+        processed = [moving_average(tr.data, parameters['window_size']) for tr in data]
     else:
         raise ValueError(f"Unknown processing method: {method}")
 
-    snr_after = calculate_snr(processed_data)
+    snr_after = _snr_from_arrays(processed)
     improvement = (snr_after - snr_before) / snr_before * 100 if snr_before != 0 else 0
 
     return {
@@ -100,32 +137,89 @@ async def process_data(data: Stream, method: str, parameters: Dict[str, Any]) ->
         "improvement": improvement
     }
 
+@lru_cache(maxsize=128)
+def _butter_sos(btype: str, freqs: tuple, fs: float, order: int = 4) -> np.ndarray:
+    """Butterworth second-order sections in float32, built once per (btype, freqs, fs, order)."""
+    return butter(order, freqs if len(freqs) > 1 else freqs[0], btype=btype, fs=fs, output='sos').astype(np.float32)
+
+def _filter_sos(method: str, parameters: Dict[str, Any], fs: float) -> np.ndarray:
+    """Return the SOS coefficients for a filter method, following obspy's corner-frequency rules."""
+    nyquist = 0.5 * fs
+    if method == "bandpass":
+        if parameters['freqmax'] / nyquist - 1.0 > -1e-6:
+            # Same fallback as obspy: a bandpass reaching Nyquist becomes a highpass
+            return _filter_sos("highpass", {'freq': parameters['freqmin']}, fs)
+        if parameters['freqmin'] > nyquist:
+            raise ValueError("Selected low corner frequency is above Nyquist.")
+        return _butter_sos('bandpass', (float(parameters['freqmin']), float(parameters['freqmax'])), fs)
+    if parameters['freq'] > nyquist:
+        raise ValueError("Selected corner frequency is above Nyquist.")
+    return _butter_sos(method, (float(parameters['freq']),), fs)
+
+def moving_average(data: np.ndarray, window_size: int) -> np.ndarray:
+    """Centered box filter, equivalent to np.convolve(data, np.ones(w), 'same') / w.
+
+    Uses a prefix sum so the cost is O(N) regardless of window size.
+    """
+    left = window_size // 2
+    padded = np.zeros(len(data) + window_size, dtype=np.float64)
+    np.cumsum(data, out=padded[left + 1:left + 1 + len(data)])
+    padded[left + 1 + len(data):] = padded[left + len(data)]
+    return (padded[window_size:] - padded[:len(data)]) / window_size
+
 def calculate_snr(data: Stream) -> float:
     """Calculate Signal-to-Noise Ratio of the data."""
     if not data or len(data) == 0:
         return 0
-    signal = np.concatenate([tr.data for tr in data])
-    return np.mean(np.abs(signal)) / np.std(signal) if len(signal) > 0 else 0
+    return _snr_from_arrays([tr.data for tr in data])
+
+def _snr_from_arrays(arrays: List[np.ndarray]) -> float:
+    # Accumulate per-trace moments instead of concatenating every trace into one
+    # buffer, merging them with Chan et al.'s pairwise update for the variance.
+    abs_sum = mean = m2 = 0.0
+    n = 0
+    for arr in arrays:
+        tr_abs, tr_mean, tr_m2, tr_n = _snr_kernel(arr)
+        if tr_n == 0:
+            continue
+        total = n + tr_n
+        delta = tr_mean - mean
+        mean += delta * tr_n / total
+        m2 += tr_m2 + delta * delta * n * tr_n / total
+        abs_sum += tr_abs
+        n = total
+    if n == 0:
+        return 0
+    std = np.sqrt(m2 / n)
+    return (abs_sum / n) / std if std > 0 else 0
 
 async def detect_events(data: Stream, method: str, parameters: Dict[str, Any]) -> List[DetectedEvent]:
     """Detect seismic events in the data."""
     if method == "sta_lta":
         from obspy.signal.trigger import recursive_sta_lta, trigger_onset
+        from app.core.gpu import GPU_MIN_TRACES, gpu_available, recursive_sta_lta_batch
         
         sta = parameters.get('sta', 1)
         lta = parameters.get('lta', 10)
         threshold = parameters.get('threshold', 3)
         
+        nstas = [int(sta * tr.stats.sampling_rate) for tr in data]
+        nltas = [int(lta * tr.stats.sampling_rate) for tr in data]
+        if len(data) >= GPU_MIN_TRACES and gpu_available():
+            cfts = recursive_sta_lta_batch([tr.data for tr in data], nstas, nltas)
+        else:
+            cfts = [recursive_sta_lta(tr.data, nsta, nlta) for tr, nsta, nlta in zip(data, nstas, nltas)]
+        
         events = []
-        for tr in data:
-            cft = recursive_sta_lta(tr.data, int(sta * tr.stats.sampling_rate), int(lta * tr.stats.sampling_rate))
-            triggers = trigger_onset(cft, threshold, threshold)
+        for tr, cft in zip(data, cfts):
+            triggers = np.asarray(trigger_onset(cft, threshold, threshold), dtype=np.int64).reshape(-1, 2)
+            if len(triggers) == 0:
+                continue
+            annotations = _annotate(tr.data, triggers, cft)
             
-            for on, off in triggers:
+            for (on, off), (magnitude, confidence) in zip(triggers, annotations):
                 start_time = tr.stats.starttime + on / tr.stats.sampling_rate
                 end_time = tr.stats.starttime + off / tr.stats.sampling_rate
-                magnitude = np.max(np.abs(tr.data[on:off]))
-                confidence = cft[on]
                 
                 events.append(DetectedEvent(
                     start_time=start_time.datetime,
@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.api.responses import NumpyJSONResponse
+from app.core.data_loader import sync_all_metadata
+from app.core.kernels import warmup_kernels
 
-app = FastAPI(title="Seismic Detection API")
+app = FastAPI(title="Seismic Detection API", default_response_class=NumpyJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -15,10 +18,21 @@ app.add_middleware(
 
 app.include_router(router)
 
+@app.on_event("startup")
+async def warmup():
+    """Warm the Numba kernels before serving traffic."""
+    warmup_kernels()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Seismic Detection API"}
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Ingest once here rather than in every worker's startup; requests resync
+    # lazily when a dataset directory changes (see sync_if_changed)
+    sync_all_metadata()
+    # Workers need an import string rather than the app object
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools",
+                workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
\ No newline at end of file
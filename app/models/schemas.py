@@ -10,6 +10,12 @@ class FileInfo(BaseModel):
     end_time: datetime
 
 class DatasetFiles(BaseModel):
+    # Columnar: entry i of each list describes the same file
+    filenames: List[str]
+    start_times: List[datetime]
+    end_times: List[datetime]
+
+class DatasetFilesV1(BaseModel):
     files: List[FileInfo]
     
 class DatasetInfo(BaseModel):
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+from obspy import Stream, Trace, UTCDateTime
+
+from app.core import data_loader, database
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, monkeypatch):
+    """An empty 'lunar' dataset backed by a throwaway metadata database."""
+    monkeypatch.setattr(data_loader, 'DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setattr(data_loader, 'INGEST_LOCK_FILE', str(tmp_path / 'ingest.lock'))
+    monkeypatch.setattr(data_loader, '_synced_mtimes', {})
+    monkeypatch.setattr(database, 'DATABASE_FILE', str(tmp_path / 'metadata.db'))
+    monkeypatch.setattr(database, '_conn', None)
+    path = tmp_path / 'data' / 'lunar'
+    path.mkdir(parents=True)
+    yield path
+    if database._conn is not None:
+        database._conn.close()
+
+
+def _write_mseed(path, starttime, mtime_ns=None):
+    tr = Trace(np.arange(100, dtype=np.int32), header={'starttime': starttime, 'sampling_rate': 10.0})
+    Stream([tr]).write(str(path), format='MSEED')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _start_times():
+    return {row['filename']: row['start_time'] for row in data_loader.get_dataset_files('lunar')}
+
+
+def test_sync_picks_up_added_removed_and_rewritten_files(dataset_dir):
+    t0 = UTCDateTime(1970, 1, 19)
+    _write_mseed(dataset_dir / 'f1.mseed', t0, mtime_ns=1_000_000_000)
+    _write_mseed(dataset_dir / 'f2.mseed', t0)
+    assert _start_times() == {'f1.mseed': t0.datetime, 'f2.mseed': t0.datetime}
+
+    _write_mseed(dataset_dir / 'f3.mseed', t0)
+    assert set(_start_times()) == {'f1.mseed', 'f2.mseed', 'f3.mseed'}
+
+    os.remove(dataset_dir / 'f2.mseed')
+    assert set(_start_times()) == {'f1.mseed', 'f3.mseed'}
+    assert not os.path.exists(data_loader.get_parquet_path('lunar', 'f2.mseed'))
+
+    # A rewrite in place leaves the directory's mtime alone but not the file's
+    dir_mtime = os.stat(dataset_dir).st_mtime_ns
+    _write_mseed(dataset_dir / 'f1.mseed', t0 + 30 * 86400, mtime_ns=2_000_000_000)
+    os.utime(dataset_dir, ns=(dir_mtime, dir_mtime))
+    assert _start_times()['f1.mseed'] == (t0 + 30 * 86400).datetime
+
+
+def test_file_added_during_sync_is_ingested_by_the_next_sync(dataset_dir, monkeypatch):
+    t0 = UTCDateTime(1970, 1, 19)
+    _write_mseed(dataset_dir / 'f1.mseed', t0)
+    generate_metadata = data_loader.generate_metadata
+
+    def generate_then_add(dataset):
+        generate_metadata(dataset)
+        if not (dataset_dir / 'late.mseed').exists():
+            _write_mseed(dataset_dir / 'late.mseed', t0)
+
+    monkeypatch.setattr(data_loader, 'generate_metadata', generate_then_add)
+    data_loader.sync_if_changed('lunar')
+    assert set(_start_times()) == {'f1.mseed', 'late.mseed'}
+
+
+def test_parquet_route_accepts_dotted_names_with_or_without_extension(dataset_dir):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    name = 'xa.s12.00.mhz.1970-01-19HR00_evid00002'
+    _write_mseed(dataset_dir / f'{name}.mseed', UTCDateTime(1970, 1, 19))
+    client = TestClient(app)
+    for file in (name, f'{name}.mseed'):
+        response = client.get(f'/lunar/{file}.parquet')
+        assert response.status_code == 200, file
+        assert response.content[:4] == b'PAR1'
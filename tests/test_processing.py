@@ -0,0 +1,34 @@
+import numpy as np
+from obspy import Stream, Trace
+
+from app.core.processing import calculate_snr
+
+
+def _reference_snr(arrays):
+    signal = np.concatenate(arrays).astype(np.float64)
+    return np.mean(np.abs(signal)) / np.std(signal)
+
+
+def test_snr_matches_numpy_on_offset_integer_counts():
+    # Raw counts with a large DC offset used to lose their variance to
+    # cancellation in the one-pass sum(x**2) - sum(x)**2 / n formula.
+    rng = np.random.default_rng(0)
+    for offset, sigma in [(1e6, 1), (5e6, 10), (-3e7, 2)]:
+        arrays = [
+            (offset + sigma * rng.standard_normal(360_000)).astype(np.int32),
+            (offset + 5 * sigma + sigma * rng.standard_normal(1_000)).astype(np.int32),
+        ]
+        data = Stream([Trace(a) for a in arrays])
+        np.testing.assert_allclose(calculate_snr(data), _reference_snr(arrays), rtol=1e-9)
+
+
+def test_snr_matches_numpy_on_float_traces():
+    rng = np.random.default_rng(1)
+    arrays = [rng.standard_normal(10_000), 3 + 2 * rng.standard_normal(500)]
+    data = Stream([Trace(a) for a in arrays])
+    np.testing.assert_allclose(calculate_snr(data), _reference_snr(arrays), rtol=1e-9)
+
+
+def test_snr_of_empty_or_constant_data_is_zero():
+    assert calculate_snr(Stream()) == 0
+    assert calculate_snr(Stream([Trace(np.full(100, 7, dtype=np.int32))])) == 0